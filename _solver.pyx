@@ -0,0 +1,349 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# cython: cdivision=True, initializedcheck=False
+
+"""Compiled backtracking algorithm to solve Sudoku puzzles.
+
+The same algorithm as the solver in sudoku_solver.py (row, column and
+subgrid bitmasks, naked and hidden singles, and branching on the element
+with the fewest possible values), compiled ahead of time so there is no
+numba import or compile time. sudoku_solver.py uses this module when it
+has been built with:
+
+    python setup.py build_ext --inplace
+
+License:
+    MIT License
+
+    Copyright (c) 2022 Anuram T
+
+    See sudoku_solver.py for the full license text.
+"""
+
+from libc.stdint cimport uint8_t, uint16_t
+from cython.parallel cimport prange
+
+cdef extern from *:
+    int __builtin_popcount(unsigned int x) nogil
+    int __builtin_ctz(unsigned int x) nogil
+
+cdef extern from "_solver_simd.h":
+    uint16_t unique_values(const uint16_t *cands, uint16_t *seen) nogil
+
+
+# Row, column and subgrid index of each element in a flattened 9x9
+# array, and the indexes of the elements in each row, column and subgrid
+# (the units of a Sudoku array).
+cdef int ROW_OF[81]
+cdef int COL_OF[81]
+cdef int BOX_OF[81]
+cdef int UNITS[27][9]
+
+cdef int _index
+
+for _index in range(81):
+    ROW_OF[_index] = _index // 9
+    COL_OF[_index] = _index % 9
+    BOX_OF[_index] = (_index // 27) * 3 + (_index % 9) // 3
+    UNITS[ROW_OF[_index]][COL_OF[_index]] = _index
+    UNITS[9 + COL_OF[_index]][ROW_OF[_index]] = _index
+    UNITS[18 + BOX_OF[_index]][((_index // 9) % 3) * 3 + _index % 3] = _index
+
+
+def solve(uint8_t[::1] cells):
+    """Solves a flattened Sudoku array in place.
+
+    Parameters:
+        cells: The 81 uint8 values of a flattened 9x9 Sudoku array.
+
+    Returns:
+        True if the array has been solved, else returns False and
+        leaves the array as it was before the call.
+    """
+
+    cdef int solved
+
+    if cells.shape[0] != 81:
+        raise ValueError("cells must hold 81 values")
+
+    with nogil:
+        solved = solve_c(&cells[0])
+
+    return solved != 0
+
+
+def solve_batch(uint8_t[:, ::1] cells):
+    """Solves the rows of flattened Sudoku arrays in place, in parallel.
+
+    Parameters:
+        cells: Nx81 array of the uint8 values of flattened 9x9 Sudoku
+            arrays. Unsolvable arrays are left as they were.
+    """
+
+    cdef Py_ssize_t i
+
+    if cells.shape[1] != 81:
+        raise ValueError("cells must hold 81 values in each row")
+
+    for i in prange(cells.shape[0], nogil=True):
+        solve_c(&cells[i, 0])
+
+
+cdef int solve_c(uint8_t *cells) noexcept nogil:
+    """Solves a flattened Sudoku array of 81 values in place.
+
+    Returns 1 if the array has been solved, else returns 0 and leaves
+    the array as it was before the call.
+    """
+
+    cdef uint16_t row_mask[9]
+    cdef uint16_t col_mask[9]
+    cdef uint16_t box_mask[9]
+
+    # The element being solved for at each level of the stack, the
+    # bitmask of the values which are still left to try for it, and the
+    # length of the trail before a value was tried for it.
+    cdef int stack_cell[81]
+    cdef uint16_t stack_mask[81]
+    cdef int stack_base[81]
+
+    # The elements which have been given a value, in the order they
+    # were given it, so the values can be removed when backtracking.
+    cdef int trail[81]
+    cdef int trail_len = 0
+
+    cdef int index, val, level, left, mask
+    cdef int n_empty = 0
+
+    for index in range(9):
+        row_mask[index] = 0
+        col_mask[index] = 0
+        box_mask[index] = 0
+
+    # Sets the bitmasks of the values in the array. If a value is not
+    # from 0 to 9, or has already been used in the row, column or
+    # subgrid, the array breaks Sudoku rules and is unsolvable.
+    for index in range(81):
+        val = cells[index]
+
+        if val == 0:
+            n_empty += 1
+            continue
+
+        if val > 9:
+            return 0
+
+        mask = 1 << (val - 1)
+
+        if (row_mask[ROW_OF[index]] | col_mask[COL_OF[index]]
+                | box_mask[BOX_OF[index]]) & mask:
+            return 0
+
+        row_mask[ROW_OF[index]] |= mask
+        col_mask[COL_OF[index]] |= mask
+        box_mask[BOX_OF[index]] |= mask
+
+    # Fills elements that have only one possible value before starting
+    # with the element which has the fewest possible values.
+    if not propagate(cells, row_mask, col_mask, box_mask, trail,
+                     &trail_len):
+        undo(cells, row_mask, col_mask, box_mask, trail, trail_len, 0)
+        return 0
+
+    if trail_len == n_empty:
+        return 1
+
+    index = pick_cell(cells, row_mask, col_mask, box_mask)
+    level = 0
+    stack_cell[0] = index
+    stack_base[0] = trail_len
+    stack_mask[0] = possible(row_mask, col_mask, box_mask, index)
+
+    while level >= 0:
+        # Removes the values given since the value tried last for the
+        # element (because this solution branch has failed).
+        trail_len = undo(cells, row_mask, col_mask, box_mask, trail,
+                         trail_len, stack_base[level])
+
+        # If there are no values left to try, the element before it
+        # has to be given a different value.
+        if stack_mask[level] == 0:
+            level -= 1
+            continue
+
+        # Tries the smallest value left for the element, by taking the
+        # lowest set bit off the bitmask of the values left to try.
+        index = stack_cell[level]
+        left = stack_mask[level]
+        mask = left & -left
+        stack_mask[level] = left & (left - 1)
+        place(cells, row_mask, col_mask, box_mask, index,
+              __builtin_ctz(mask) + 1)
+        trail[trail_len] = index
+        trail_len += 1
+
+        # Fills the elements which now have only one possible value. If
+        # an element or a value is left with nowhere to go, the next
+        # value is tried instead.
+        if not propagate(cells, row_mask, col_mask, box_mask, trail,
+                         &trail_len):
+            continue
+
+        if trail_len == n_empty:
+            return 1
+
+        # Moves on to the element which now has the fewest possible
+        # values.
+        index = pick_cell(cells, row_mask, col_mask, box_mask)
+        level += 1
+        stack_cell[level] = index
+        stack_base[level] = trail_len
+        stack_mask[level] = possible(row_mask, col_mask, box_mask, index)
+
+    undo(cells, row_mask, col_mask, box_mask, trail, trail_len, 0)
+
+    return 0
+
+
+cdef int propagate(uint8_t *cells, uint16_t *row_mask, uint16_t *col_mask,
+                   uint16_t *box_mask, int *trail,
+                   int *trail_len) noexcept nogil:
+    """Fills naked and hidden singles until no more can be filled.
+
+    Returns 0 if an element or a value has been left with no possible
+    place (the array cannot be solved), else returns 1.
+    """
+
+    cdef uint16_t cands[9]
+    cdef uint16_t cand, placed, seen, unique
+    cdef int index, unit, i
+    cdef int dirty = 1
+
+    while dirty:
+        dirty = 0
+
+        # Fills the elements which have only one possible value.
+        for index in range(81):
+            if cells[index] == 0:
+                cand = possible(row_mask, col_mask, box_mask, index)
+
+                if cand == 0:
+                    return 0
+
+                if cand & (cand - 1) == 0:
+                    place(cells, row_mask, col_mask, box_mask, index,
+                          __builtin_ctz(cand) + 1)
+                    trail[trail_len[0]] = index
+                    trail_len[0] += 1
+                    dirty = 1
+
+        # Fills the elements which are the only possible place for a
+        # value in a row, column or subgrid.
+        for unit in range(27):
+            placed = 0
+
+            for i in range(9):
+                index = UNITS[unit][i]
+
+                if cells[index] != 0:
+                    placed |= 1 << (cells[index] - 1)
+                    cands[i] = 0
+                else:
+                    cands[i] = possible(row_mask, col_mask, box_mask, index)
+
+            unique = unique_values(cands, &seen)
+
+            if (placed | seen) != 0x1FF:
+                return 0
+
+            if unique == 0:
+                continue
+
+            for i in range(9):
+                index = UNITS[unit][i]
+
+                if cells[index] == 0:
+                    cand = unique & possible(row_mask, col_mask, box_mask,
+                                             index)
+
+                    if cand == 0:
+                        continue
+
+                    # An element cannot be the only place for two values.
+                    if cand & (cand - 1) != 0:
+                        return 0
+
+                    place(cells, row_mask, col_mask, box_mask, index,
+                          __builtin_ctz(cand) + 1)
+                    trail[trail_len[0]] = index
+                    trail_len[0] += 1
+                    dirty = 1
+
+    return 1
+
+
+cdef int pick_cell(uint8_t *cells, uint16_t *row_mask, uint16_t *col_mask,
+                   uint16_t *box_mask) noexcept nogil:
+    """Returns the empty element with the fewest possible values."""
+
+    cdef int best = -1
+    cdef int best_count = 10
+    cdef int index, count
+
+    for index in range(81):
+        if cells[index] == 0:
+            count = __builtin_popcount(
+                possible(row_mask, col_mask, box_mask, index))
+
+            if count < best_count:
+                best = index
+                best_count = count
+
+                # One possible value or fewer cannot be beaten.
+                if count <= 1:
+                    break
+
+    return best
+
+
+cdef inline uint16_t possible(uint16_t *row_mask, uint16_t *col_mask,
+                              uint16_t *box_mask, int index) noexcept nogil:
+    """Returns the bitmask of the possible values for an element."""
+
+    return ~(row_mask[ROW_OF[index]] | col_mask[COL_OF[index]]
+             | box_mask[BOX_OF[index]]) & 0x1FF
+
+
+cdef inline void place(uint8_t *cells, uint16_t *row_mask,
+                       uint16_t *col_mask, uint16_t *box_mask, int index,
+                       int val) noexcept nogil:
+    """Gives an element a value and adds it to the bitmasks."""
+
+    cdef uint16_t mask = 1 << (val - 1)
+
+    row_mask[ROW_OF[index]] |= mask
+    col_mask[COL_OF[index]] |= mask
+    box_mask[BOX_OF[index]] |= mask
+    cells[index] = val
+
+
+cdef int undo(uint8_t *cells, uint16_t *row_mask, uint16_t *col_mask,
+              uint16_t *box_mask, int *trail, int trail_len,
+              int new_len) noexcept nogil:
+    """Removes the values given last, keeping new_len trail elements.
+
+    Returns the new number of elements in the trail (new_len).
+    """
+
+    cdef uint16_t mask
+    cdef int index
+
+    while trail_len > new_len:
+        trail_len -= 1
+        index = trail[trail_len]
+        mask = 1 << (cells[index] - 1)
+        row_mask[ROW_OF[index]] ^= mask
+        col_mask[COL_OF[index]] ^= mask
+        box_mask[BOX_OF[index]] ^= mask
+        cells[index] = 0
+
+    return trail_len
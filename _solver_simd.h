@@ -0,0 +1,79 @@
+/*
+ * Hidden singles detection for _solver.pyx.
+ *
+ * License:
+ *     MIT License
+ *
+ *     Copyright (c) 2022 Anuram T
+ *
+ *     See sudoku_solver.py for the full license text.
+ */
+
+#ifndef SOLVER_SIMD_H
+#define SOLVER_SIMD_H
+
+#include <stdint.h>
+
+#ifdef __SSE2__
+#include <emmintrin.h>
+#endif
+
+/*
+ * Returns the values seen in exactly one of the 9 possible-value masks of
+ * a row, column or subgrid, and sets seen to the values seen in any of
+ * them.
+ *
+ * A value is seen once if it is in the masks of one half of the elements
+ * and not the other, and more than once if it is seen more than once in
+ * either half or once in both. With SSE2, the first 8 masks are halved
+ * this way in 3 steps of 8 lanes at a time, and the 9th is added after.
+ */
+static inline uint16_t unique_values(const uint16_t *cands, uint16_t *seen)
+{
+    uint16_t once, more;
+
+#ifdef __SSE2__
+    __m128i x_once = _mm_loadu_si128((const __m128i *)cands);
+    __m128i x_more = _mm_setzero_si128();
+    __m128i y_once, y_more;
+
+    y_once = _mm_srli_si128(x_once, 8);
+    y_more = _mm_srli_si128(x_more, 8);
+    x_more = _mm_or_si128(_mm_or_si128(x_more, y_more),
+                          _mm_and_si128(x_once, y_once));
+    x_once = _mm_or_si128(x_once, y_once);
+
+    y_once = _mm_srli_si128(x_once, 4);
+    y_more = _mm_srli_si128(x_more, 4);
+    x_more = _mm_or_si128(_mm_or_si128(x_more, y_more),
+                          _mm_and_si128(x_once, y_once));
+    x_once = _mm_or_si128(x_once, y_once);
+
+    y_once = _mm_srli_si128(x_once, 2);
+    y_more = _mm_srli_si128(x_more, 2);
+    x_more = _mm_or_si128(_mm_or_si128(x_more, y_more),
+                          _mm_and_si128(x_once, y_once));
+    x_once = _mm_or_si128(x_once, y_once);
+
+    once = (uint16_t)_mm_cvtsi128_si32(x_once);
+    more = (uint16_t)_mm_cvtsi128_si32(x_more);
+#else
+    int i;
+
+    once = 0;
+    more = 0;
+
+    for (i = 0; i < 8; i++) {
+        more |= once & cands[i];
+        once |= cands[i];
+    }
+#endif
+
+    more |= once & cands[8];
+    once |= cands[8];
+    *seen = once;
+
+    return once & ~more;
+}
+
+#endif
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""Builds the optional compiled solver used by sudoku_solver.py.
+
+Build it next to sudoku_solver.py with:
+
+    python setup.py build_ext --inplace
+
+The extension is compiled for the CPU of the machine building it
+(-march=native), and solves batches of puzzles in parallel with OpenMP
+if the C compiler supports it. Without OpenMP, solve_batch solves the
+puzzles one after another. Building requires Cython and a C compiler.
+"""
+
+# Standard imports
+import os
+import tempfile
+
+# Third-party imports
+from Cython.Build import cythonize
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+from setuptools.errors import CompileError, LinkError
+
+
+def has_openmp(compiler) -> bool:
+    """Checks if a C compiler can build and link a program with OpenMP.
+
+    Parameters:
+        compiler: The distutils C compiler to check.
+
+    Returns:
+        True if the compiler supports -fopenmp, else returns False.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "check_openmp.c")
+
+        with open(source, "w") as file:
+            file.write("#include <omp.h>\n"
+                       "int main(void) { return omp_get_num_threads(); }\n")
+
+        try:
+            objects = compiler.compile([source], output_dir=tmp_dir,
+                                       extra_postargs=["-fopenmp"])
+            compiler.link_executable(objects,
+                                     os.path.join(tmp_dir, "check_openmp"),
+                                     extra_postargs=["-fopenmp"])
+        except (CompileError, LinkError):
+            return False
+
+    return True
+
+
+class BuildExt(build_ext):
+    """Builds the extension with OpenMP where the C compiler allows."""
+
+    def build_extensions(self):
+        if self.compiler.compiler_type == "msvc":
+            compile_args = ["/O2", "/openmp"]
+            link_args = []
+        elif has_openmp(self.compiler):
+            compile_args = ["-O3", "-march=native", "-fopenmp"]
+            link_args = ["-fopenmp"]
+        else:
+            compile_args = ["-O3", "-march=native"]
+            link_args = []
+
+        for ext in self.extensions:
+            ext.extra_compile_args = compile_args
+            ext.extra_link_args = link_args
+
+        super().build_extensions()
+
+
+setup(
+    name="sudoku-solver",
+    py_modules=["sudoku_solver"],
+    cmdclass={"build_ext": BuildExt},
+    ext_modules=cythonize(
+        [
+            Extension(
+                "_solver",
+                ["_solver.pyx"],
+                depends=["_solver_simd.h"],
+            )
+        ]
+    ),
+)
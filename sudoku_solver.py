@@ -27,74 +27,572 @@ License:
 """
 
 # Standard imports
-import copy
+from typing import Optional
 
 # Third-party imports
 import numpy
 
+# Optional compiled solver, built from _solver.pyx with setup.py. It
+# has no import or compile time, so when it has been built numba is not
+# imported either. Any other module named _solver is ignored.
+try:
+    import _solver
+except ImportError:
+    _solver = None
 
-def solve_sudoku(arr: numpy.ndarray, index: int = 0) -> numpy.ndarray:
+if not (hasattr(_solver, "solve") and hasattr(_solver, "solve_batch")):
+    _solver = None
+
+# Optional third-party imports. Without numba or the compiled solver,
+# the solver runs as plain Python, which gives the same results but is
+# much slower.
+numba = None
+
+if _solver is None:
+    try:
+        import numba
+    except ImportError:
+        pass
+
+if numba is not None:
+    from numba import njit, prange
+else:
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Returns the decorated function unchanged."""
+
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        return lambda func: func
+
+
+# First row/column index of the subgrid each row/column is in. For
+# example, rows 3 to 5 are in the subgrids which start at row 3.
+BOX_START = tuple((val // 3) * 3 for val in range(9))
+
+# Subgrid index of each element in a flattened 9x9 array.
+BOX_OF = tuple(BOX_START[row] + col // 3 for row in range(9)
+               for col in range(9))
+
+# Number of set bits in each 9-bit mask, which is the number of values
+# in a bitmask of possible values.
+POPCOUNT = tuple(bin(mask).count("1") for mask in range(512))
+
+# The largest value in each 9-bit mask, which is the value of a bitmask
+# holding a single value.
+DIGIT = tuple(mask.bit_length() for mask in range(512))
+
+# Indexes of the elements in each row, column and subgrid (the units of
+# a Sudoku array) in a flattened 9x9 array.
+UNITS = (tuple(tuple(row * 9 + col for col in range(9)) for row in range(9))
+         + tuple(tuple(row * 9 + col for row in range(9)) for col in range(9))
+         + tuple(tuple(index for index in range(81) if BOX_OF[index] == box)
+                 for box in range(9)))
+
+# Indexes of the elements which share a row, column or subgrid with each
+# element (the peers of the element) in a flattened 9x9 array.
+PEERS = tuple(tuple(sorted(set(UNITS[index // 9] + UNITS[9 + index % 9]
+                               + UNITS[18 + BOX_OF[index]]) - {index}))
+              for index in range(81))
+
+# A random key for each value in each element of a flattened 9x9 array.
+# The keys of the values in an array are XORed together into a key for
+# the whole array (Zobrist hashing).
+ZOBRIST = numpy.random.default_rng(0).integers(
+    -2 ** 63, 2 ** 63 - 1, size=(81, 10), dtype=numpy.int64)
+
+# Keys of arrays which are known to be unsolvable, shared by every call
+# to solve_sudoku. Each key is stored at the slot given by its low bits,
+# replacing whichever key was there, so the memory used stays bounded.
+_DEAD_ENDS = numpy.zeros(1 << 18, dtype=numpy.int64)
+
+
+def solve_sudoku(arr: numpy.ndarray) -> numpy.ndarray:
     """Solves a 9x9 Sudoku array.
 
     Parameters:
         arr: 9x9 array to be solved with Sudoku rules and backtracking.
-        index: The position in the array which the function is solving
-            for. Do not specify the index when calling the function!
-            (default 0)
 
     Returns:
         A solved 9x9 Sudoku array. If unsolvable, returns the original
         arr argument.
+
+    Raises:
+        ValueError: If arr does not hold 81 values.
     """
 
-    # Deepcopies the original array in case the function needs to return
-    # it (when a possible route fails to solve the array).
-    orig_arr = copy.deepcopy(arr)
-
-    # Fills elements in the array where there is only one possible
-    # value. Continues to fill the array until there are only elements
-    # with multiple possible values left.
-    arr = fill_sudoku(arr)
-
-    # Calculates the row and column of the element which the function is
-    # finding a valid value for.
-    row = index // 9
-    col = index % 9
-
-    # If the array has been solved, return the array.
-    #
-    # If the element does not need solving (there is already a
-    # value from 1 to 9), solve the rest of the array. If the returned
-    # array is solved, return the array. If not, return the original
-    # array (because this solution branch has failed).
-    #
-    # Otherwise, get the possible values for the current element and
-    # iterate through each value until you get a returned array which is
-    # fully solved. If there are no values that returns a fully solved
-    # array, return the original array (because this solution branch
-    # has failed).
-    if is_solved(arr):
+    if numpy.size(arr) != 81:
+        raise ValueError("arr must hold 81 values")
+
+    # Values outside 0 to 9 break Sudoku rules, and would wrap around
+    # when narrowed to one byte (256 would become an empty element).
+    if not ((arr >= 0) & (arr <= 9)).all():
         return arr
-    elif arr[row][col] != 0:
-        arr = solve_sudoku(arr, index + 1)
 
-        if is_solved(arr):
-            return arr
-        else:
-            return orig_arr
+    # Copies the array into 81 one-byte values.
+    cells = numpy.array(arr, dtype=numpy.uint8).ravel()
+
+    if _solver is not None:
+        solved = _solver.solve(cells)
     else:
-        for val in get_possible(arr, row, col):
-            arr[row][col] = val
+        solved = _solve_cells_nb(cells, _DEAD_ENDS)
+
+    if not solved:
+        return arr
+
+    return cells.reshape(9, 9).astype(arr.dtype, copy=False)
+
+
+def solve_many(arrs: numpy.ndarray) -> numpy.ndarray:
+    """Solves many 9x9 Sudoku arrays, in parallel where possible.
+
+    Parameters:
+        arrs: Nx9x9 array of the 9x9 arrays to be solved with Sudoku
+            rules and backtracking.
+
+    Returns:
+        An Nx9x9 array of the solved 9x9 Sudoku arrays. Unsolvable
+        arrays are returned as they were in the arrs argument.
+
+    Raises:
+        ValueError: If arrs does not hold 9x9 arrays.
+    """
+
+    arrs = numpy.asarray(arrs)
+
+    if arrs.shape[-2:] != (9, 9):
+        raise ValueError("arrs must hold 9x9 arrays")
+
+    solved = numpy.array(arrs).reshape(-1, 81)
+
+    # Only solves the arrays with values from 0 to 9, as solve_sudoku
+    # does. The rest break Sudoku rules and are left as they were.
+    valid = ((solved >= 0) & (solved <= 9)).all(axis=1)
+
+    # Copies the arrays into rows of 81 one-byte values.
+    cells = solved[valid].astype(numpy.uint8)
+
+    if _solver is not None:
+        _solver.solve_batch(cells)
+    else:
+        _solve_batch_nb(cells, _DEAD_ENDS)
+
+    solved[valid] = cells
+
+    return solved.reshape(arrs.shape)
+
+
+@njit(cache=True, parallel=True)
+def _solve_batch_nb(cells: numpy.ndarray, dead: numpy.ndarray) -> None:
+    """Solves the rows of flattened Sudoku arrays in place, in parallel.
+
+    Parameters:
+        cells: Nx81 array of the values of flattened 9x9 Sudoku arrays.
+        dead: Table of the keys of arrays known to be unsolvable, as
+            in _solve_nb. It is shared by every thread, which is safe
+            since a slot only ever holds a whole key of a dead array.
+    """
+
+    for i in prange(cells.shape[0]):
+        _solve_cells_nb(cells[i], dead)
+
+
+@njit(cache=True)
+def _solve_cells_nb(cells: numpy.ndarray, dead: numpy.ndarray) -> bool:
+    """Solves a flattened Sudoku array in place.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        dead: Table of the keys of arrays known to be unsolvable, as
+            in _solve_nb.
+
+    Returns:
+        True if the array has been solved, else returns False and
+        leaves the array as it was before the call.
+    """
+
+    # Allocates a bitmask for each row, column and subgrid, where bit
+    # val - 1 is set if the value val has been used in that row, column
+    # or subgrid.
+    row_mask = numpy.zeros(9, dtype=numpy.int32)
+    col_mask = numpy.zeros(9, dtype=numpy.int32)
+    box_mask = numpy.zeros(9, dtype=numpy.int32)
+
+    if not _fill_masks_nb(cells, row_mask, col_mask, box_mask):
+        return False
+
+    return _solve_nb(cells, row_mask, col_mask, box_mask, dead)
+
+
+@njit(cache=True)
+def _fill_masks_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+                   col_mask: numpy.ndarray, box_mask: numpy.ndarray) -> bool:
+    """Sets the bitmasks of the values in a flattened Sudoku array.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Zeroed bitmasks of the values used in each row.
+        col_mask: Zeroed bitmasks of the values used in each column.
+        box_mask: Zeroed bitmasks of the values used in each subgrid.
+
+    Returns:
+        True if the values follow Sudoku rules, else returns False.
+    """
+
+    for index in range(81):
+        val = int(cells[index])
+
+        # A value above 9 breaks Sudoku rules, and has no key in
+        # ZOBRIST to look up.
+        if val > 9:
+            return False
+
+        if val != 0:
+            row = index // 9
+            col = index % 9
+            box = BOX_OF[index]
+            mask = 1 << (val - 1)
+
+            # If the value has already been used in the row, column or
+            # subgrid, the array breaks Sudoku rules and is unsolvable.
+            if (row_mask[row] | col_mask[col] | box_mask[box]) & mask:
+                return False
+
+            row_mask[row] |= mask
+            col_mask[col] |= mask
+            box_mask[box] |= mask
+
+    return True
+
+
+@njit(cache=True)
+def _solve_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+              col_mask: numpy.ndarray, box_mask: numpy.ndarray,
+              dead: numpy.ndarray) -> bool:
+    """Solves a flattened Sudoku array in place with backtracking.
+
+    The backtracking uses an explicit stack instead of recursion, so
+    the function can be compiled by numba.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Bitmasks of the values used in each row.
+        col_mask: Bitmasks of the values used in each column.
+        box_mask: Bitmasks of the values used in each subgrid.
+        dead: Table of the keys of arrays known to be unsolvable, with a
+            power of two length. Keys of the arrays found to be
+            unsolvable are added to it.
+
+    Returns:
+        True if the array has been solved, else returns False and
+        leaves the arguments as they were before the call.
+    """
+
+    # The element being solved for at each level of the stack, the
+    # bitmask of the values which are still left to try for it, the
+    # length of the trail before a value was tried for it, and the key
+    # of the array before a value was tried for it.
+    stack_cell = numpy.empty(81, dtype=numpy.int32)
+    stack_mask = numpy.empty(81, dtype=numpy.uint16)
+    stack_base = numpy.empty(81, dtype=numpy.int32)
+    stack_key = numpy.empty(81, dtype=numpy.int64)
+    slots = dead.shape[0] - 1
+
+    # The elements which have been given a value, in the order they
+    # were given it, so the values can be removed when backtracking.
+    trail = numpy.empty(81, dtype=numpy.int32)
+
+    # Every element which is given a value goes on the trail, so the
+    # array has been solved once the trail is as long as the number of
+    # elements which were empty.
+    n_empty = 0
+
+    for index in range(81):
+        if cells[index] == 0:
+            n_empty += 1
+
+    # Fills elements that have only one possible value before starting
+    # with the element which has the fewest possible values.
+    trail_len, ok = _propagate_nb(cells, row_mask, col_mask, box_mask,
+                                  trail, 0)
+
+    if ok and trail_len == n_empty:
+        return True
+
+    # Skips solving if the array is known to be unsolvable. A key of 0
+    # is never looked up, since it marks an empty slot.
+    key = 0
+
+    for index in range(81):
+        if cells[index] != 0:
+            key ^= ZOBRIST[index, cells[index]]
+
+    if key != 0 and dead[key & slots] == key:
+        ok = False
+
+    index = _pick_cell_nb(cells, row_mask, col_mask, box_mask)
+    level = 0
+    stack_cell[0] = index
+    stack_base[0] = trail_len
+    stack_key[0] = key
+    stack_mask[0] = 0
+
+    if ok:
+        stack_mask[0] = ~(row_mask[index // 9] | col_mask[index % 9]
+                          | box_mask[BOX_OF[index]]) & 0x1FF
+
+    while level >= 0:
+        # Removes the values given since the value tried last for the
+        # element (because this solution branch has failed).
+        trail_len = _undo_nb(cells, row_mask, col_mask, box_mask,
+                             trail, trail_len, stack_base[level])
+
+        # If there are no values left to try, the array as it was
+        # before trying them is unsolvable, and the element before it
+        # has to be given a different value.
+        if stack_mask[level] == 0:
+            key = stack_key[level]
+            dead[key & slots] = key
+            level -= 1
+            continue
+
+        # Tries the smallest value left for the element, by taking the
+        # lowest set bit off the bitmask of the values left to try.
+        index = stack_cell[level]
+        left = int(stack_mask[level])
+        mask = left & -left
+        stack_mask[level] = left & (left - 1)
+        _place_nb(cells, row_mask, col_mask, box_mask, index, DIGIT[mask])
+        trail[trail_len] = index
+        trail_len += 1
+
+        # Fills the elements which now have only one possible value. If
+        # an element or a value is left with nowhere to go, the next
+        # value is tried instead.
+        trail_len, ok = _propagate_nb(cells, row_mask, col_mask, box_mask,
+                                      trail, trail_len)
+
+        if not ok:
+            continue
+
+        if trail_len == n_empty:
+            return True
+
+        # Updates the key with the values given since the last level,
+        # and tries the next value instead if the array is known to be
+        # unsolvable.
+        key = stack_key[level]
+
+        for i in range(stack_base[level], trail_len):
+            key ^= ZOBRIST[trail[i], cells[trail[i]]]
+
+        if key != 0 and dead[key & slots] == key:
+            continue
+
+        # Moves on to the element which now has the fewest possible
+        # values.
+        index = _pick_cell_nb(cells, row_mask, col_mask, box_mask)
+        level += 1
+        stack_cell[level] = index
+        stack_base[level] = trail_len
+        stack_key[level] = key
+        stack_mask[level] = ~(row_mask[index // 9] | col_mask[index % 9]
+                              | box_mask[BOX_OF[index]]) & 0x1FF
+
+    _undo_nb(cells, row_mask, col_mask, box_mask, trail, stack_base[0], 0)
+
+    return False
+
+
+@njit(cache=True)
+def _propagate_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+                  col_mask: numpy.ndarray, box_mask: numpy.ndarray,
+                  trail: numpy.ndarray, trail_len: int) -> tuple:
+    """Fills flattened Sudoku array elements that have one possible value.
+
+    Fills naked singles (elements with only one possible value) and
+    hidden singles (values with only one possible element in a row,
+    column or subgrid) until no more elements can be filled.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Bitmasks of the values used in each row.
+        col_mask: Bitmasks of the values used in each column.
+        box_mask: Bitmasks of the values used in each subgrid.
+        trail: The elements which have been given a value, in order.
+        trail_len: The number of elements in the trail.
+
+    Returns:
+        The new number of elements in the trail, and False if an
+        element or a value has been left with no possible place (the
+        array cannot be solved), else True.
+    """
+
+    dirty = True
 
-            if is_solved(arr):
-                return arr
-            elif index != 80:
-                arr = solve_sudoku(arr, index + 1)
+    while dirty:
+        dirty = False
 
-                if is_solved(arr):
-                    return arr
+        # Fills the elements which have only one possible value.
+        for index in range(81):
+            if cells[index] == 0:
+                cand = ~(row_mask[index // 9] | col_mask[index % 9]
+                         | box_mask[BOX_OF[index]]) & 0x1FF
 
-        return orig_arr
+                if cand == 0:
+                    return trail_len, False
+
+                if cand & (cand - 1) == 0:
+                    _place_nb(cells, row_mask, col_mask, box_mask,
+                              index, DIGIT[cand])
+                    trail[trail_len] = index
+                    trail_len += 1
+                    dirty = True
+
+        # Fills the elements which are the only possible place for a
+        # value in a row, column or subgrid. The values possible in
+        # exactly one element are those seen once but never again.
+        for unit in range(27):
+            placed = 0
+            once = 0
+            more = 0
+
+            for i in range(9):
+                index = UNITS[unit][i]
+
+                if cells[index] != 0:
+                    placed |= 1 << (int(cells[index]) - 1)
+                else:
+                    cand = ~(row_mask[index // 9] | col_mask[index % 9]
+                             | box_mask[BOX_OF[index]]) & 0x1FF
+                    more |= once & cand
+                    once |= cand
+
+            if (placed | once) != 0x1FF:
+                return trail_len, False
+
+            unique = once & ~more
+
+            if unique == 0:
+                continue
+
+            for i in range(9):
+                index = UNITS[unit][i]
+
+                if cells[index] == 0:
+                    cand = unique & ~(row_mask[index // 9]
+                                      | col_mask[index % 9]
+                                      | box_mask[BOX_OF[index]])
+
+                    if cand == 0:
+                        continue
+
+                    # An element cannot be the only place for two values.
+                    if cand & (cand - 1) != 0:
+                        return trail_len, False
+
+                    _place_nb(cells, row_mask, col_mask, box_mask,
+                              index, DIGIT[cand])
+                    trail[trail_len] = index
+                    trail_len += 1
+                    dirty = True
+
+    return trail_len, True
+
+
+@njit(cache=True)
+def _place_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+              col_mask: numpy.ndarray, box_mask: numpy.ndarray,
+              index: int, val: int) -> None:
+    """Gives an element of a flattened Sudoku array a value.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Bitmasks of the values used in each row.
+        col_mask: Bitmasks of the values used in each column.
+        box_mask: Bitmasks of the values used in each subgrid.
+        index: The position of the element in the flattened array.
+        val: The value to give the element.
+    """
+
+    mask = 1 << (val - 1)
+    row_mask[index // 9] |= mask
+    col_mask[index % 9] |= mask
+    box_mask[BOX_OF[index]] |= mask
+    cells[index] = val
+
+
+@njit(cache=True)
+def _undo_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+             col_mask: numpy.ndarray, box_mask: numpy.ndarray,
+             trail: numpy.ndarray, trail_len: int, new_len: int) -> int:
+    """Removes the values given last to a flattened Sudoku array.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Bitmasks of the values used in each row.
+        col_mask: Bitmasks of the values used in each column.
+        box_mask: Bitmasks of the values used in each subgrid.
+        trail: The elements which have been given a value, in order.
+        trail_len: The number of elements in the trail.
+        new_len: The number of elements to keep in the trail.
+
+    Returns:
+        The new number of elements in the trail (new_len).
+    """
+
+    while trail_len > new_len:
+        trail_len -= 1
+        index = trail[trail_len]
+        mask = 1 << (int(cells[index]) - 1)
+        row_mask[index // 9] ^= mask
+        col_mask[index % 9] ^= mask
+        box_mask[BOX_OF[index]] ^= mask
+        cells[index] = 0
+
+    return trail_len
+
+
+@njit(cache=True)
+def _pick_cell_nb(cells: numpy.ndarray, row_mask: numpy.ndarray,
+                  col_mask: numpy.ndarray, box_mask: numpy.ndarray) -> int:
+    """Returns the empty element with the fewest possible values.
+
+    Solving the most constrained element first greatly reduces the
+    amount of backtracking.
+
+    Parameters:
+        cells: The 81 values of a flattened 9x9 Sudoku array.
+        row_mask: Bitmasks of the values used in each row.
+        col_mask: Bitmasks of the values used in each column.
+        box_mask: Bitmasks of the values used in each subgrid.
+
+    Returns:
+        The index of the empty element with the fewest possible values.
+        If every element has a value, returns -1.
+    """
+
+    best = -1
+    best_count = 10
+
+    for index in range(81):
+        if cells[index] == 0:
+            count = POPCOUNT[~(row_mask[index // 9] | col_mask[index % 9]
+                               | box_mask[BOX_OF[index]]) & 0x1FF]
+
+            if count < best_count:
+                best = index
+                best_count = count
+
+                # An element with no possible values means the branch
+                # has failed, and one with a single possible value
+                # cannot be beaten, so there is no need to look further.
+                if count <= 1:
+                    break
+
+    return best
 
 
 def fill_sudoku(arr: numpy.ndarray) -> numpy.ndarray:
@@ -108,136 +606,150 @@ def fill_sudoku(arr: numpy.ndarray) -> numpy.ndarray:
         the original arr argument.
     """
 
-    # Iterates through each element and fills elements that have only
-    # one possible value. If any element has been filled (by comparing
-    # it to the array before being filled), the loop iterates through
-    # each element again. This continues until no more elements can be
-    # filled.
-    while True:
-        orig_arr = copy.deepcopy(arr)
+    masks = get_masks(arr)
 
-        arr = fill_rows(arr)
-        arr = fill_columns(arr)
-        arr = fill_subgrids(arr)
+    # Iterates through each row, column and subgrid and fills elements
+    # that have only one possible value. If any element has been
+    # filled, the loop iterates through each of them again. This
+    # continues until no more elements can be filled.
+    changed = True
 
-        if (arr == orig_arr).all():
-            break
+    while changed:
+        changed = False
+
+        for unit in UNITS:
+            changed = fill_unit(arr, unit, masks) or changed
 
     return arr
 
 
-def fill_rows(arr: numpy.ndarray) -> numpy.ndarray:
+def fill_rows(arr: numpy.ndarray) -> bool:
     """Fills Sudoku array elements that have only one possible value.
 
     Parameters:
-        arr: 9x9 array to be filled using Sudoku row rules.
+        arr: 9x9 array to be filled in place using Sudoku row rules.
 
     Returns:
-        A filled 9x9 Sudoku array. If no elements can be filled, returns
-        the original arr argument.
+        True if any element has been filled, else returns False.
     """
-    
-    # Iterates through each row and iterates through values 1 to 9,
-    # checking if the value is only possible in one element in the row.
-    # If so, sets the element in the row as that value. Continues to
-    # check every row with every value and fills elements where
-    # possible.
-    for row in range(9):
-        for val in range(1, 10):
-            possible_cells = []
-
-            for col in range(9):
-                if arr[row][col] == 0:
-                    if is_valid(arr, row, col, val):
-                        possible_cells.append((row, col))
-
-                if len(possible_cells) > 1:
-                    break
 
-            if len(possible_cells) == 1:
-                r, c = possible_cells[0]
-                arr[r][c] = val
+    masks = get_masks(arr)
+    changed = False
 
-    return arr
+    for unit in UNITS[:9]:
+        changed = fill_unit(arr, unit, masks) or changed
 
+    return changed
 
-def fill_columns(arr: numpy.ndarray) -> numpy.ndarray:
+
+def fill_columns(arr: numpy.ndarray) -> bool:
     """Fills Sudoku array elements that have only one possible value.
 
     Parameters:
-        arr: 9x9 array to be filled using Sudoku column rules.
+        arr: 9x9 array to be filled in place using Sudoku column rules.
 
     Returns:
-        A filled 9x9 Sudoku array. If no elements can be filled, returns
-        the original arr argument.
+        True if any element has been filled, else returns False.
     """
-    
-    # Iterates through each column and iterates through values 1 to 9,
-    # checking if the value is only possible in one element in the
-    # column. If so, sets the element in the column as that value.
-    # Continues to check every column with every value and fills
-    # elements where possible.
-    for col in range(9):
-        for val in range(1, 10):
-            possible_cells = []
-
-            for row in range(9):
-                if arr[row][col] == 0:
-                    if is_valid(arr, row, col, val):
-                        possible_cells.append((row, col))
-
-                if len(possible_cells) > 1:
-                    break
 
-            if len(possible_cells) == 1:
-                r, c = possible_cells[0]
-                arr[r][c] = val
+    masks = get_masks(arr)
+    changed = False
 
-    return arr
+    for unit in UNITS[9:18]:
+        changed = fill_unit(arr, unit, masks) or changed
 
+    return changed
 
-def fill_subgrids(arr: numpy.ndarray) -> numpy.ndarray:
+
+def fill_subgrids(arr: numpy.ndarray) -> bool:
     """Fills Sudoku array elements that have only one possible value.
 
     Parameters:
-        arr: 9x9 array to be filled using Sudoku subgrid rules.
+        arr: 9x9 array to be filled in place using Sudoku subgrid rules.
 
     Returns:
-        A filled 9x9 Sudoku array. If no elements can be filled, returns
-        the original arr argument.
+        True if any element has been filled, else returns False.
     """
 
-    # Iterates through each subgrid and iterates through values 1 to 9,
-    # checking if the value is only possible in one element in the
-    # subgrid. If so, sets the element in the subgrid as that value.
-    # Continues to check every subgrid with every value and fills
-    # elements where possible.
-    for row_start in [0, 3, 6]:
-        for col_start in [0, 3, 6]:
-            for val in range(1, 10):
-                possible_cells = []
+    masks = get_masks(arr)
+    changed = False
 
-                for row in range(row_start, row_start + 3):
-                    for col in range(col_start, col_start + 3):
-                        if arr[row][col] == 0:
-                            if is_valid(arr, row, col, val):
-                                possible_cells.append((row, col))
+    for unit in UNITS[18:]:
+        changed = fill_unit(arr, unit, masks) or changed
 
-                        if len(possible_cells) > 1:
-                            break
+    return changed
 
-                    if len(possible_cells) > 1:
-                        break
 
-                if len(possible_cells) == 1:
-                    r, c = possible_cells[0]
-                    arr[r][c] = val
+def fill_unit(arr: numpy.ndarray, unit: tuple, masks: tuple) -> bool:
+    """Fills the elements of a row, column or subgrid with one value.
 
-    return arr
+    Fills the elements which have only one possible value, and the
+    elements which are the only possible place for a value in the row,
+    column or subgrid.
+
+    Parameters:
+        arr: 9x9 array to be filled in place using Sudoku rules.
+        unit: Indexes of the elements of the row, column or subgrid in
+            the flattened array, as in UNITS.
+        masks: The bitmasks of the values used in arr, as returned by
+            get_masks. They are updated as elements are filled.
+
+    Returns:
+        True if any element has been filled, else returns False.
+    """
+
+    row_mask, col_mask, box_mask = masks
+    flat = arr.ravel()
+    empty = [index for index in unit if flat[index] == 0]
+
+    # Gets the possible values of each empty element once, and finds the
+    # values which are possible in exactly one element, which are those
+    # seen once but never again.
+    possibles = []
+    once = 0
+    more = 0
+    single = False
+
+    for index in empty:
+        possible = ~(row_mask[index // 9] | col_mask[index % 9]
+                     | box_mask[BOX_OF[index]]) & 0x1FF
+        possibles.append(possible)
+        more |= once & possible
+        once |= possible
+
+        if POPCOUNT[possible] == 1:
+            single = True
+
+    unique = once & ~more
+
+    # If no value has only one place and no element has only one
+    # possible value, there is nothing to fill.
+    if not unique and not single:
+        return False
+
+    changed = False
+
+    # Fills each element which is the only place for a value, or which
+    # has only one possible value left. Once an element has been
+    # filled, the possible values are checked again, since filling an
+    # element can rule values out of another.
+    for index, possible in zip(empty, possibles):
+        if changed:
+            possible = ~(row_mask[index // 9] | col_mask[index % 9]
+                         | box_mask[BOX_OF[index]]) & 0x1FF
+
+        if possible & unique:
+            possible &= unique
+
+        if POPCOUNT[possible] == 1:
+            set_value(arr, masks, index // 9, index % 9, DIGIT[possible])
+            changed = True
+
+    return changed
 
 
 def get_possible(arr: numpy.ndarray, row: int, col: int) -> list:
-    """Returns a list of the most probable values for an element.
+    """Returns a list of the possible values for an element.
 
     Parameters:
         arr: 9x9 Sudoku array to check element possibilities for.
@@ -245,58 +757,40 @@ def get_possible(arr: numpy.ndarray, row: int, col: int) -> list:
         col: Column of element to check possibilities for.
 
     Returns:
-        Returns a list of the most probable values for an element,
-        using Sudoku rules to reduce the number of possible values.
+        Returns a list of the possible values for an element, using
+        Sudoku rules. The values are ordered from least to most
+        constraining, which makes the first values the most probable.
         Helpful for reducing the amount of backtracking.
     """
 
-    # Gets all the possible values for the element
-    possible = [val for val in range(1, 10) if is_valid(arr, row, col, val)]
-    occurences = {}
-    probable = []
-
-    # Finds the rows of the subgrid the element is in. For each row the
-    # element is not located in and which are not filled completely,
-    # we iterate through each value in the row. If that value is a 
-    # possible value for the element, we use a dictionary to store
-    # the amount of occurences of the value.
-    for sub_row in [get_subgrid_start(row) + i for i in range(3)]:
-        if sub_row != row:
-            sub_row_vals = [val for val in arr[sub_row]]
-
-            if 0 in sub_row_vals:
-                for val in sub_row_vals:
-                    if val != 0 and val in possible:
-                        if val in occurences.keys():
-                            occurences[val] += 1
-                        else:
-                            occurences[val] = 1
-
-    # Finds the columns of the subgrid the element is in. For each
-    # column the element is not located in and which are not filled
-    # completely, we iterate through each value in the column. If that
-    # value is a possible value for the element, we use a dictionary to
-    # store the amount of occurences of the value.
-    for sub_col in [get_subgrid_start(col) + i for i in range(3)]:
-        if sub_col != col:
-            sub_col_vals = [arr[arow][sub_col] for arow in range(9)]
-
-            if 0 in sub_col_vals:
-                for val in sub_col_vals:
-                    if val != 0 and val in possible:
-                        if val in occurences.keys():
-                            occurences[val] += 1
-                        else:
-                            occurences[val] = 1
-
-    # Using the amount of occurences of each possible value, we can
-    # predict which values will most likely be the right one, so we
-    # append the values to a list in order of most occured to least.
-    for num in range(4, 0, -1):
-        if num in occurences.values():
-            for key in occurences.keys():
-                if num == occurences[key]:
-                    probable.append(key)
+    row_mask, col_mask, box_mask = get_masks(arr)
+    index = row * 9 + col
+
+    # Gets the bitmask of the possible values for the element, and the
+    # bitmasks of the possible values for each of its empty peers.
+    flat = arr.ravel()
+    possible = ~(row_mask[row] | col_mask[col] | box_mask[BOX_OF[index]])
+    peer_possible = [~(row_mask[peer // 9] | col_mask[peer % 9]
+                       | box_mask[BOX_OF[peer]])
+                     for peer in PEERS[index] if flat[peer] == 0]
+
+    # Counts how many empty peers each possible value would remove an
+    # option from, in a list indexed by value. The values which remove
+    # the fewest options leave the most room to solve the rest of the
+    # array, so they are the most likely to be the right one (least
+    # constraining value).
+    counts = [0] * 10
+
+    for mask in peer_possible:
+        shared = possible & mask & 0x1FF
+
+        while shared:
+            bit = shared & -shared
+            counts[DIGIT[bit]] += 1
+            shared ^= bit
+
+    probable = [val for val in range(1, 10) if possible >> (val - 1) & 1]
+    probable.sort(key=counts.__getitem__)
 
     return probable
 
@@ -311,26 +805,20 @@ def is_solved(arr: numpy.ndarray) -> bool:
         True if the array is fully solved, else returns False.
     """
 
-    # Iterates through each element in the array and checks if the 
-    # value assigned to it is valid using Sudoku rules.
-    for row in range(9):
-        for col in range(9):
-            val = arr[row][col]
-
-            if val == 0:
-                return False
-            else:
-                arr[row][col] = 0
-
-                if not is_valid(arr, row, col, val):
-                    return False
+    # A solved array only holds values from 1 to 9.
+    if not numpy.isin(arr, range(1, 10)).all():
+        return False
 
-                arr[row][col] = val
+    # Every row, column and subgrid of a solved array holds each value
+    # from 1 to 9 exactly once, which is the only way for all of their
+    # bitmasks to be full.
+    row_mask, col_mask, box_mask = get_masks(arr)
 
-    return True
+    return all(mask == 0x1FF for mask in row_mask + col_mask + box_mask)
 
 
-def is_valid(arr: numpy.ndarray, row: int, col: int, val: int) -> bool:
+def is_valid(arr: numpy.ndarray, row: int, col: int, val: int,
+             masks: Optional[tuple] = None) -> bool:
     """Checks if a value in a certain element follows Sudoku rules.
 
     Assumes the element is empty (the value of the cell is 0).
@@ -340,52 +828,72 @@ def is_valid(arr: numpy.ndarray, row: int, col: int, val: int) -> bool:
         row: Row of element to check value validity for. 
         col: Column of element to check value validity for.
         val: The value to check validity for in a certain element.
+        masks: The bitmasks of the values used in arr, as returned by
+            get_masks. Pass them when checking many elements of the
+            same array, which is much faster. (default None)
 
     Returns:
         True if the value is valid in the element, else returns False.
     """
 
-    # Values in the column of the element
-    elem_col = [arr[row][col] for row in range(9)]
-
-    # Getting the values in the subgrid of the element
-    elem_subgrid = []
-    row_start = get_subgrid_start(row)
-    col_start = get_subgrid_start(col)
-
-    for r in range(row_start, row_start + 3):
-        for c in range(col_start, col_start+3):
-            elem_subgrid.append(arr[r][c])
-
     # Checking if the value is in the row, column, or subgrid of
     # the element
-    if val not in arr[row] and val not in elem_col:
-        if val not in elem_subgrid:
-            return True
+    if masks is None:
+        row_start = BOX_START[row]
+        col_start = BOX_START[col]
 
-    return False
+        return not (val in arr[row] or val in arr[:, col]
+                    or val in arr[row_start:row_start + 3,
+                                  col_start:col_start + 3])
+
+    row_mask, col_mask, box_mask = masks
+    used = row_mask[row] | col_mask[col] | box_mask[BOX_OF[row * 9 + col]]
 
+    return not (used >> (val - 1)) & 1
 
-def get_subgrid_start(val: int) -> int:
-    """Returns the first row/column index of a subgrid in a 9x9 array.
 
-    The Sudoku subgrid is determined by the parameter val, w
+def get_masks(arr: numpy.ndarray) -> tuple:
+    """Returns bitmasks of the values used in a Sudoku array.
 
     Parameters:
-        val: A row or column of a 9x9 Sudoku array, which determines
-            what subgrid index to return.
+        arr: 9x9 Sudoku array to get the bitmasks for.
 
     Returns:
-        The first row/column index of a subgrid in a 9x9 Sudoku array.
-        For example, if an element's row was located in the middle
-        of the array, the function would return 3.
+        A tuple of three lists with the bitmasks of the values used in
+        each row, column and subgrid, where bit val - 1 is set if the
+        value val has been used.
     """
 
-    if 0 <= val <= 2:
-        subgrid_start = 0
-    elif 3 <= val <= 5:
-        subgrid_start = 3
-    elif 6 <= val <= 8:
-        subgrid_start = 6
+    row_mask = [0] * 9
+    col_mask = [0] * 9
+    box_mask = [0] * 9
+
+    for index, val in enumerate(arr.ravel().astype(numpy.int64).tolist()):
+        if val != 0:
+            mask = 1 << (val - 1)
+            row_mask[index // 9] |= mask
+            col_mask[index % 9] |= mask
+            box_mask[BOX_OF[index]] |= mask
+
+    return row_mask, col_mask, box_mask
+
+
+def set_value(arr: numpy.ndarray, masks: tuple, row: int, col: int,
+              val: int) -> None:
+    """Sets an empty element of a Sudoku array and updates its bitmasks.
+
+    Parameters:
+        arr: 9x9 Sudoku array to set the element in.
+        masks: The bitmasks of the values used in arr, as returned by
+            get_masks.
+        row: Row of element to set.
+        col: Column of element to set.
+        val: The value to set the element to.
+    """
 
-    return subgrid_start
\ No newline at end of file
+    row_mask, col_mask, box_mask = masks
+    mask = 1 << (val - 1)
+    row_mask[row] |= mask
+    col_mask[col] |= mask
+    box_mask[BOX_OF[row * 9 + col]] |= mask
+    arr[row, col] = val